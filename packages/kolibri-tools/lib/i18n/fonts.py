@@ -4,15 +4,21 @@ For usage instructions, see:
     https://kolibri-dev.readthedocs.io/en/develop/references/i18n.html
 """
 import argparse
+import atexit
 import base64
+import functools
+import hashlib
 import io
-import json
 import logging
 import mimetypes
+import multiprocessing
 import os
+import pickle
 import re
 import sys
 import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
 
 import noto_source
 import utils
@@ -39,6 +45,19 @@ except AssertionError:
 
 from fontTools import merge  # noqa E402
 from fontTools import subset  # noqa E402
+from fontTools.ttLib import TTFont  # noqa E402
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    # orjson is only used to speed up reading locale files
+    from json import loads as json_loads
+
+try:
+    import numpy as np
+except ImportError:
+    # only used to speed up unicode range generation
+    np = None
 
 
 """
@@ -78,6 +97,13 @@ SCOPE_FULL = "noto-full"
 SCOPE_SUBSET = "noto-subset"
 SCOPE_COMMON = "noto-common"
 
+# number of threads used to read locale files
+LOCALE_READ_THREADS = 8
+
+# results of expensive font lookups, persisted between runs. This is kept with the
+# source fonts rather than in OUTPUT_PATH, which is distributed with Kolibri.
+DISK_CACHE_PATH = os.path.join(noto_source.FONTS_SOURCE, ".font_cache.pkl")
+
 """
 Shared helpers
 """
@@ -94,6 +120,9 @@ _FONT_FACE = """
 }}
 """
 
+# split around the url, so that inlined font data can be streamed in between
+_FONT_FACE_HEAD, _FONT_FACE_TAIL = _FONT_FACE.split("{url}")
+
 FONT_WEIGHT_NAME_MAP = {
     "Regular": "normal",
     "SemiBold": "600",
@@ -122,7 +151,16 @@ def _woff_font_path(name, weight):
     return os.path.join(OUTPUT_PATH, file_name)
 
 
-def _load_font(path):
+@utils.memoize
+def _full_font_path(font_name, weight):
+    return _woff_font_path(_scoped(SCOPE_FULL, font_name), weight)
+
+
+def _load_font(path, lazy=False):
+    """
+    Load a font file. Lazily loaded fonts only decompile tables as they are accessed,
+    and are not suitable for subsetting.
+    """
     guess = mimetypes.guess_type(path)
     if guess[0] not in [
         "font/ttc",
@@ -137,6 +175,8 @@ def _load_font(path):
         logging.error("If this is a text file: do you have Git LFS installed?")
         sys.exit(1)
     try:
+        if lazy:
+            return TTFont(path, lazy=True)
         return subset.load_font(path, FONT_TOOLS_OPTIONS, dontLoadGlyphNames=True)
     except FileNotFoundError as e:  # noqa F821
         logging.error("Could not load font: {}".format(str(e)))
@@ -144,10 +184,114 @@ def _load_font(path):
         sys.exit(1)
 
 
+def _read_disk_cache():
+    try:
+        with io.open(DISK_CACHE_PATH, mode="rb") as f:
+            return pickle.load(f)
+    except Exception:
+        # a missing or damaged cache is rebuilt
+        return {}
+
+
+# maps (function name, args) to (version, result), read from disk on first use
+_disk_cache = None
+
+
+def _get_disk_cache():
+    global _disk_cache
+    if _disk_cache is None:
+        _disk_cache = _read_disk_cache()
+    return _disk_cache
+
+
+# maps function names to the function computing the version of their results
+_disk_cache_versions = {}
+
+
+@utils.memoize
+def _source_version():
+    """
+    Fingerprint of this module's source, which covers the cached functions along with
+    any helpers, literals and constants they depend on
+    """
+    with io.open(__file__, mode="rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _disk_cached(version):
+    """
+    Persist the results of a function between runs. `version` is called with the same
+    arguments as the function and must return a value that changes whenever the
+    result would, such as the modification time of a file.
+
+    Results are also discarded whenever this module's source changes.
+    """
+
+    def decorator(func):
+        name = "{}.{}".format(func.__name__, _source_version())
+        _disk_cache_versions[name] = version
+
+        @functools.wraps(func)
+        def cached_func(*args):
+            cache = _get_disk_cache()
+            key = (name, args)
+            current = version(*args)
+            if key not in cache or cache[key][0] != current:
+                cache[key] = (current, func(*args))
+            return cache[key][1]
+
+        return cached_func
+
+    return decorator
+
+
+@atexit.register
+def _write_disk_cache():
+    """
+    Persist cached results, dropping any that are out of date.
+
+    Only the main process writes the cache, and it replaces the file atomically so
+    that worker processes never read a partially written one.
+    """
+    if not _disk_cache or multiprocessing.parent_process() is not None:
+        return
+    entries = {}
+    for (name, args), (cached_version, result) in _disk_cache.items():
+        version = _disk_cache_versions.get(name)
+        if version is not None and version(*args) == cached_version:
+            entries[(name, args)] = (cached_version, result)
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(DISK_CACHE_PATH))
+    except OSError as e:
+        logging.warning("Could not write font cache: {}".format(str(e)))
+        return
+    try:
+        with io.open(fd, mode="wb") as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, DISK_CACHE_PATH)
+    except OSError as e:
+        # the cache only saves time, so never let it break font generation
+        logging.warning("Could not write font cache: {}".format(str(e)))
+        os.unlink(tmp_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _font_file_version(font_path):
+    """
+    Modification time of a font file, or None if it does not exist
+    """
+    try:
+        return os.stat(font_path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
 @utils.memoize
 def _font_priorities(default_font):
     """
-    Given a default font, return a list of all possible font names roughly in the order
+    Given a default font, return a tuple of all possible font names roughly in the order
     that we ought to look for glyphs in. Many fonts contain overlapping sets of glyphs.
 
     Without doing this: we risk loading a bunch of random font files just because they
@@ -155,32 +299,44 @@ def _font_priorities(default_font):
     of the glyphs if they happen to differ.
     """
 
+    font_names = []
+    seen = set()
+
+    def add(name):
+        if name not in seen:
+            seen.add(name)
+            font_names.append(name)
+
     # start with the default
-    font_names = [default_font]
+    add(default_font)
 
     # look in the latin set next
-    if default_font is not NOTO_SANS_LATIN:
-        font_names.append(NOTO_SANS_LATIN)
+    add(NOTO_SANS_LATIN)
 
     # then look at the rest of the supported languages' default fonts
     for lang_info in utils.available_languages():
-        name = lang_info[utils.KEY_DEFAULT_FONT]
-        if name not in font_names:
-            font_names.append(name)
+        add(lang_info[utils.KEY_DEFAULT_FONT])
 
     # finally look at the remaining langauges
-    font_names.extend([fn for fn in noto_source.FONT_MANIFEST if fn not in font_names])
-    return font_names
+    for name in noto_source.FONT_MANIFEST:
+        add(name)
+
+    # a tuple, so that callers cannot modify the cached value
+    return tuple(font_names)
 
 
 @utils.memoize
+@_disk_cached(_font_file_version)
 def _font_glyphs(font_path):
     """
     extract set of all glyphs from a font
     """
+    # only the cmap table is needed, so avoid decompiling the others
+    font = _load_font(font_path, lazy=True)
     glyphs = set()
-    for table in _load_font(font_path)["cmap"].tables:
+    for table in font["cmap"].tables:
         glyphs |= set(table.cmap.keys())
+    font.close()
     return glyphs
 
 
@@ -188,11 +344,11 @@ def _clean_up(scope):
     """
     Delete all files in OUTPUT_PATH that match the scope
     """
-    css_pattern = r"{}.*?\.css".format(scope)
-    woff_pattern = r"{}.*?\.woff".format(scope)
-    for name in os.listdir(OUTPUT_PATH):
-        if re.match(css_pattern, name) or re.match(woff_pattern, name):
-            os.unlink(os.path.join(OUTPUT_PATH, name))
+    pattern = re.compile(r"{}.*?\.(css|woff)".format(re.escape(scope)))
+    with os.scandir(OUTPUT_PATH) as entries:
+        for entry in entries:
+            if entry.is_file() and pattern.match(entry.name):
+                os.unlink(entry.path)
 
 
 """
@@ -216,6 +372,27 @@ def _list_to_ranges(input_list):
     """
     Iterator of ranges of contiguous numbers from a list of integers.
     Ranges returned are [x, y) – in other words, y is non-inclusive.
+    """
+    if np is None:
+        return _list_to_ranges_py(input_list)
+    return _list_to_ranges_np(input_list)
+
+
+def _list_to_ranges_np(input_list):
+    """
+    Finds the boundaries of contiguous runs with vectorized NumPy operations
+    """
+    codes = np.fromiter(input_list, dtype=np.int64)
+    codes.sort()
+    breaks = np.flatnonzero(np.diff(codes) != 1) + 1
+    starts = np.concatenate((codes[:1], codes[breaks]))
+    ends = np.concatenate((codes[breaks - 1], codes[-1:])) + 1
+    return zip(starts.tolist(), ends.tolist())
+
+
+def _list_to_ranges_py(input_list):
+    """
+    Pure-Python fallback for when NumPy is not installed
     (from: http://code.activestate.com/recipes/496682/)
     """
     new_list = list(input_list)
@@ -231,21 +408,14 @@ def _list_to_ranges(input_list):
     yield tuple(currentrange)  # last range
 
 
-def _fmt_code(code):
-    return "{:x}".format(code).upper()
-
-
 def _fmt_range(glyphs):
     """
     Generates a font-face-compatible 'unicode range' attribute for a given set of glyphs
     """
-    fmt_ranges = []
-    for r in _list_to_ranges(sorted(glyphs)):
-        if r[0] == r[1] - 1:
-            fmt_ranges.append("U+{}".format(_fmt_code(r[0])))
-        else:
-            fmt_ranges.append("U+{}-{}".format(_fmt_code(r[0]), _fmt_code(r[1] - 1)))
-    return ",".join(fmt_ranges)
+    return ",".join(
+        f"U+{start:X}" if start == end - 1 else f"U+{start:X}-{end - 1:X}"
+        for start, end in _list_to_ranges(glyphs)
+    )
 
 
 """
@@ -253,13 +423,22 @@ Full Fonts
 """
 
 
+def _write_css(output_name, font_faces):
+    """
+    Write a CSS file with a single write call
+    """
+    logging.info("Writing {}".format(output_name))
+    with open(output_name, "w") as f:
+        f.write("".join([CSS_HEADER] + font_faces))
+
+
 def _full_font_face(font_family, font_name, weight, omit_glyphs=None):
     """
     generate the CSS reference for a single full font
     """
     if omit_glyphs is None:
         omit_glyphs = set()
-    file_path = _woff_font_path(_scoped(SCOPE_FULL, font_name), weight)
+    file_path = _full_font_path(font_name, weight)
     file_name = os.path.basename(file_path)
     glyphs = _font_glyphs(file_path) - omit_glyphs
     if not glyphs:
@@ -278,26 +457,23 @@ def _gen_full_css_modern(lang_info):
     # all available fonts
     font_faces = []
     for font_name in _font_priorities(lang_info[utils.KEY_DEFAULT_FONT]):
-        for weight in noto_source.WEIGHTS:
-            font_faces.append(
-                _full_font_face(
-                    SCOPE_FULL, font_name, weight, omit_glyphs=previous_glyphs
-                )
-            )
+        # Assumes all variants have the same glyphs, from the content Regular font
+        reg_glyphs = _font_glyphs(_full_font_path(font_name, "Regular"))
+        available = reg_glyphs - previous_glyphs
+        previous_glyphs |= reg_glyphs
+        if not available:
+            continue
 
-        # Assumes all four variants have the same glyphs, from the content Regular font
-        previous_glyphs |= _font_glyphs(
-            _woff_font_path(_scoped(SCOPE_FULL, font_name), "Regular")
-        )
+        unicodes = _fmt_range(available)
+        for weight in noto_source.WEIGHTS:
+            file_name = os.path.basename(_full_font_path(font_name, weight))
+            font_faces.append(_gen_font_face(SCOPE_FULL, file_name, weight, unicodes))
 
     output_name = os.path.join(
         OUTPUT_PATH,
         "{}.modern.css".format(_scoped(SCOPE_FULL, lang_info[utils.KEY_INTL_CODE])),
     )
-    logging.info("Writing {}".format(output_name))
-    with open(output_name, "w") as f:
-        f.write(CSS_HEADER)
-        f.write("".join(font_faces))
+    _write_css(output_name, font_faces)
 
 
 def _gen_full_css_basic(lang_info):
@@ -305,34 +481,56 @@ def _gen_full_css_basic(lang_info):
         OUTPUT_PATH,
         "{}.basic.css".format(_scoped(SCOPE_FULL, lang_info[utils.KEY_INTL_CODE])),
     )
-    logging.info("Writing {}".format(output_name))
-    with open(output_name, "w") as f:
-        f.write(CSS_HEADER)
-        default_font = lang_info[utils.KEY_DEFAULT_FONT]
-        for weight in noto_source.WEIGHTS:
-            f.write(_full_font_face(SCOPE_FULL, default_font, weight))
+    default_font = lang_info[utils.KEY_DEFAULT_FONT]
+    _write_css(
+        output_name,
+        [
+            _full_font_face(SCOPE_FULL, default_font, weight)
+            for weight in noto_source.WEIGHTS
+        ],
+    )
 
 
 def _write_full_font(font_name, weight):
     font = _load_font(noto_source.get_path(font_name, weight))
-    output_name = _woff_font_path(_scoped(SCOPE_FULL, font_name), weight)
+    output_name = _full_font_path(font_name, weight)
     logging.info("Writing {}".format(output_name))
     font.save(output_name)
 
 
+def _write_full_font_weights(font_name):
+    """
+    Write all weights of a single full font. Runs in a worker process, so it only
+    takes a font name rather than any fontTools objects.
+    """
+    for weight in noto_source.WEIGHTS:
+        _write_full_font(font_name, weight)
+
+
+def _gen_full_css(lang_info):
+    _gen_full_css_modern(lang_info)
+    _gen_full_css_basic(lang_info)
+
+
 def command_gen_full_fonts():
     logging.info("generating full fonts...")
 
     _clean_up(SCOPE_FULL)
 
+    # each font is parsed and re-serialized independently, so spread them across cores
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(_write_full_font_weights, noto_source.FONT_MANIFEST))
+
+    # the fonts were just rewritten, so read their glyph sets once here and flush them
+    # to the disk cache, rather than having every CSS worker parse every font again
     for font_name in noto_source.FONT_MANIFEST:
         for weight in noto_source.WEIGHTS:
-            _write_full_font(font_name, weight)
+            _font_glyphs(_full_font_path(font_name, weight))
+    _write_disk_cache()
 
     languages = utils.available_languages(include_in_context=True, include_english=True)
-    for lang_info in languages:
-        _gen_full_css_modern(lang_info)
-        _gen_full_css_basic(lang_info)
+    with ProcessPoolExecutor() as executor:
+        list(executor.map(_gen_full_css, languages))
 
     logging.info("finished generating full fonts")
 
@@ -350,25 +548,38 @@ def _chunks(string, n=72):
         yield string[i : i + n]
 
 
+# 54 bytes encode to exactly one 72-character line of base64, without padding
+_BASE64_READ_SIZE = 54 * 1024
+
+
+def _write_font_data_uri(file_object, font_path):
+    """
+    Streams a font file into a binary file object as a base64-encoded data URI
+    """
+    file_object.write(b"data:application/x-font-woff;charset=utf-8;base64,\\\n")
+    separator = b""
+    with io.open(font_path, mode="rb") as f:
+        chunk = f.read(_BASE64_READ_SIZE)
+        while chunk:
+            file_object.write(separator)
+            file_object.write(b"\\\n".join(_chunks(base64.b64encode(chunk))))
+            separator = b"\\\n"
+            chunk = f.read(_BASE64_READ_SIZE)
+
+
 def _write_inline_font(file_object, font_path, font_family, weight):
     """
     Inlines a font as base64 encoding within a CSS file
     """
-    with io.open(font_path, mode="rb") as f:
-        data = f.read()
-    data_uri = "data:application/x-font-woff;charset=utf-8;base64,\\\n{}".format(
-        "\\\n".join(_chunks(base64.b64encode(data).decode()))
-    )
     glyphs = _font_glyphs(font_path)
     if not glyphs:
         return
+    file_object.write(_FONT_FACE_HEAD.format(family=font_family).encode("utf-8"))
+    _write_font_data_uri(file_object, font_path)
     file_object.write(
-        _gen_font_face(
-            family=font_family,
-            url=data_uri,
-            weight=weight,
-            unicodes=_fmt_range(glyphs),
-        )
+        _FONT_FACE_TAIL.format(
+            weight=FONT_WEIGHT_NAME_MAP[weight], unicodes=_fmt_range(glyphs)
+        ).encode("utf-8")
     )
 
 
@@ -379,53 +590,76 @@ def _generate_inline_font_css(name, font_family):
 
     output_name = os.path.join(OUTPUT_PATH, "{}.css".format(name))
     logging.info("Writing {}".format(output_name))
-    with open(output_name, "w") as f:
-        f.write(CSS_HEADER)
+    with open(output_name, "wb") as f:
+        f.write(CSS_HEADER.encode("utf-8"))
         for weight in noto_source.WEIGHTS:
             font_path = _woff_font_path(name, weight)
             _write_inline_font(f, font_path, font_family, weight)
             os.unlink(font_path)
 
 
-def _get_subset_font(source_file_path, text):
+def _get_subsetter(unicodes):
+    """
+    Returns a fontTools Subsetter for a set of codepoints. It can be reused for every
+    weight of a font, since each call to `subset` starts again from the codepoints.
+
+    Note that the subsetter derives the same codepoint set from text as it is given
+    here, so ligatures and other features important for correct rendering are kept.
     """
-    Given a source file and some text, returns a new, in-memory fontTools Font object
-    that has only the glyphs specified in the set.
+    subsetter = subset.Subsetter(options=FONT_TOOLS_OPTIONS)
+    subsetter.populate(unicodes=unicodes)
+    return subsetter
+
 
-    Note that passing actual text instead of a glyph set to the subsetter allows it to
-    generate appropriate ligatures and other features important for correct rendering.
+def _get_subset_font(source_file_path, subsetter):
+    """
+    Given a source file and a populated subsetter, returns a new, in-memory fontTools
+    Font object that has only the requested glyphs, along with any glyphs reachable
+    from them through the font's layout features.
     """
     if not os.path.exists(source_file_path):
         logging.error("'{}' not found".format(source_file_path))
 
     font = _load_font(source_file_path)
-    subsetter = subset.Subsetter(options=FONT_TOOLS_OPTIONS)
-    subsetter.populate(text=text)
     subsetter.subset(font)
     return font
 
 
+def _read_json_file(file_path):
+    with io.open(file_path, mode="rb") as f:
+        return json_loads(f.read())
+
+
 def _get_lang_strings(locale_dir):
     """
-    Text used in a particular language
+    Set of codepoints in the text used in a particular language
     """
 
-    strings = []
+    # include the whitespace that used to separate strings
+    unicodes = {ord(" ")}
 
-    for file_name in os.listdir(locale_dir):
-        if not file_name.endswith(".json"):
-            continue
+    file_paths = [
+        os.path.join(locale_dir, file_name)
+        for file_name in os.listdir(locale_dir)
+        if file_name.endswith(".json")
+    ]
 
-        file_path = os.path.join(locale_dir, file_name)
-        with io.open(file_path, mode="r", encoding="utf-8") as f:
-            lang_strings = json.load(f).values()
+    # overlap reading and parsing of the locale files
+    chars = set()
+    with ThreadPoolExecutor(max_workers=LOCALE_READ_THREADS) as executor:
+        for data in executor.map(_read_json_file, file_paths):
+            for s in data.values():
+                chars.update(s)
 
-        for s in lang_strings:
-            s = re.sub(r"\W", " ", s)  # clean whitespace
-            strings.append(s)
-            strings.append(s.upper())
+    # Replacing non-word characters with whitespace and upper-casing both work one
+    # character at a time, so only apply them to each distinct character once.
+    # A character is a word character (regex \w) if it is alphanumeric or "_".
+    for c in chars:
+        if c.isalnum() or c == "_":
+            unicodes.add(ord(c))
+            unicodes.update(map(ord, c.upper()))
 
-    return strings
+    return unicodes
 
 
 @utils.memoize
@@ -467,21 +701,38 @@ def _get_common_strings():
     return strings
 
 
+class _InMemoryMerger(merge.Merger):
+    """
+    Merger that takes serialized fonts as bytes rather than a list of file names.
+
+    The fonts still have to be re-parsed: the merger renames glyphs while tables are
+    decompiled, so handing it already-decompiled subset fonts would leave duplicate
+    glyph names in the merged tables.
+    """
+
+    def _openFonts(self, fontfiles):
+        return super()._openFonts([io.BytesIO(data) for data in fontfiles])
+
+
+def _font_bytes(font):
+    """
+    Serialize a fontTools font object without WOFF compression
+    """
+    font.flavor = None
+    buffer = io.BytesIO()
+    font.save(buffer)
+    return buffer.getvalue()
+
+
 def _merge_fonts(fonts, output_file_path):
     """
     Given a list of fontTools font objects, merge them and export to output_file_path.
 
-    Implemenatation note: it would have been nice to pass the fonts directly to the
-    merger, but the current fontTools implementation of Merger takes a list of file names
-    """
-    tmp = tempfile.gettempdir()
-    f_names = []
-    for i, f in enumerate(fonts):
-        tmp_font_path = os.path.join(tmp, "{}.woff".format(i))
-        f_names.append(tmp_font_path)
-        f.save(tmp_font_path)
-    merger = merge.Merger(options=FONT_TOOLS_OPTIONS)
-    merged_font = merger.merge(f_names)
+    Fonts are passed to the merger as uncompressed in-memory buffers, which avoids
+    writing temporary WOFF files and compressing and decompressing each of them.
+    """
+    merger = _InMemoryMerger(options=FONT_TOOLS_OPTIONS)
+    merged_font = merger.merge([_font_bytes(f) for f in fonts])
     merged_font.save(output_file_path)
     logging.info("created {}".format(output_file_path))
 
@@ -497,41 +748,58 @@ FONTS_TO_EXCLUDE_FROM_SUBSET = {
 }
 
 
-def _subset_and_merge_fonts(text, default_font, scope):
+def _subset_and_merge_fonts(unicodes, default_font, scope):
     """
-    Given text, generate both a bold and a regular font that can render it.
+    Given a set of codepoints, generate both a bold and a regular font that can
+    render them.
     """
     subsets = {}
     for weight in noto_source.WEIGHTS:
         subsets[weight] = []
 
     # track which glyphs are left
-    remaining_glyphs = set([ord(c) for c in text])
+    remaining_glyphs = set(unicodes)
 
     for font_name in _font_priorities(default_font):
 
         if font_name in FONTS_TO_EXCLUDE_FROM_SUBSET:
             continue
 
+        # Assumes all weights have the same glyphs, from the Regular font
+        full_reg_path = _full_font_path(font_name, "Regular")
+        new_glyphs = _font_glyphs(full_reg_path) & remaining_glyphs
+
+        # only subset fonts that contribute glyphs, but always keep the default font
+        if not new_glyphs and font_name != default_font:
+            continue
+
+        subsetter = _get_subsetter(new_glyphs)
         for weight in noto_source.WEIGHTS:
-            full_path = _woff_font_path(_scoped(SCOPE_FULL, font_name), weight)
-            subset = _get_subset_font(full_path, text)
-            subsets[weight].append(subset)
+            full_path = _full_font_path(font_name, weight)
+            subsets[weight].append(_get_subset_font(full_path, subsetter))
 
-        full_reg_path = _woff_font_path(_scoped(SCOPE_FULL, font_name), "Regular")
-        new_glyphs = _font_glyphs(full_reg_path)
         remaining_glyphs -= new_glyphs
         if not remaining_glyphs:
             break
 
-        text = "".join([c for c in text if ord(c) in remaining_glyphs])
-
     for weight in noto_source.WEIGHTS:
         subset_path = _woff_font_path(scope, weight)
         subset = subsets[weight]
         _merge_fonts(subset, os.path.join(OUTPUT_PATH, subset_path))
 
 
+def _gen_lang_subset_fonts(locale_data_folder, lang_info):
+    logging.info("gen subset for {}".format(lang_info[utils.KEY_ENG_NAME]))
+    name = lang_info[utils.KEY_INTL_CODE]
+    _subset_and_merge_fonts(
+        unicodes=_get_lang_strings(
+            utils.local_locale_path(lang_info, locale_data_folder)
+        ),
+        default_font=lang_info[utils.KEY_DEFAULT_FONT],
+        scope=_scoped(SCOPE_SUBSET, name),
+    )
+
+
 def command_gen_subset_fonts(locale_data_folder):
     """
     Creates custom fonts that attempt to contain all the glyphs and other font features
@@ -547,25 +815,32 @@ def command_gen_subset_fonts(locale_data_folder):
     _clean_up(SCOPE_COMMON)
     _clean_up(SCOPE_SUBSET)
 
+    common_unicodes = set()
+    for s in _get_common_strings():
+        common_unicodes.update(map(ord, s))
+
     _subset_and_merge_fonts(
-        text=" ".join(_get_common_strings()),
+        unicodes=common_unicodes,
         default_font=NOTO_SANS_LATIN,
         scope=SCOPE_COMMON,
     )
 
-    languages = utils.available_languages(include_in_context=True, include_english=True)
-    for lang_info in languages:
-        logging.info("gen subset for {}".format(lang_info[utils.KEY_ENG_NAME]))
-        strings = []
-        strings.extend(
-            _get_lang_strings(utils.local_locale_path(lang_info, locale_data_folder))
-        )
+    # read all glyph sets and flush them to the disk cache before starting worker
+    # processes, so that workers load them from there (or inherit them when forked)
+    # rather than each parsing the same fonts again
+    for font_name in noto_source.FONT_MANIFEST:
+        if font_name not in FONTS_TO_EXCLUDE_FROM_SUBSET:
+            _font_glyphs(_full_font_path(font_name, "Regular"))
+    _write_disk_cache()
 
-        name = lang_info[utils.KEY_INTL_CODE]
-        _subset_and_merge_fonts(
-            text=" ".join(strings),
-            default_font=lang_info[utils.KEY_DEFAULT_FONT],
-            scope=_scoped(SCOPE_SUBSET, name),
+    # each language is subset and merged independently, so spread them across cores
+    languages = utils.available_languages(include_in_context=True, include_english=True)
+    with ProcessPoolExecutor() as executor:
+        list(
+            executor.map(
+                functools.partial(_gen_lang_subset_fonts, locale_data_folder),
+                languages,
+            )
         )
 
     # generate common subset file